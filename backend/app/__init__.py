@@ -8,7 +8,11 @@ def create_app(config_name='default'):
     app = Flask(__name__)
     app.config.from_object(config[config_name])
     config[config_name].init_app(app)
-    
+
+    # Compact, unsorted JSON responses (Flask's default provider always sorts keys and pretty-prints in debug)
+    app.json.compact = True
+    app.json.sort_keys = False
+
     # Enable CORS for frontend integration
     CORS(app, supports_credentials=True, resources={r"/api/*": {"origins": "*"}}) # Allow all origins for dev simplicity, or specify localhost:5173
     
@@ -21,5 +25,11 @@ def create_app(config_name='default'):
     app.register_blueprint(admin.bp)
     app.register_blueprint(debug.bp)
     app.register_blueprint(common.bp) # for / and static stuff if needed
+
+    # Ensure the schema exists and the PHR listing index matches what is on disk
+    from .services.storage.db import init_db
+    from .services.storage.phr import rebuild_phr_index
+    init_db()
+    rebuild_phr_index()
     
     return app
@@ -1,18 +1,15 @@
 
-from flask import Blueprint, request, session
+from flask import Blueprint, request
 import os
-import json
+from app.services.audit.logger import read_events
 from app.services.storage.users import get_all_users_with_attributes, get_user_by_id, add_attribute, remove_attribute
-from app.services.utils import api_success, api_error
-from config import Config
+from app.services.utils import api_success, api_error, require_role
 
 bp = Blueprint('admin', __name__, url_prefix='/api/admin')
 
 @bp.route("/users")
+@require_role("admin")
 def api_users():
-    if "user_id" not in session or session.get("role") != "admin":
-        return api_error("Unauthorized", 403)
-
     try:
         users = get_all_users_with_attributes()
         return api_success({"users": users})
@@ -20,11 +17,9 @@ def api_users():
         return api_error(f"Failed to load users: {str(e)}", 500)
 
 @bp.route("/attributes", methods=["POST"])
+@require_role("admin")
 def api_attributes():
-    if "user_id" not in session or session.get("role") != "admin":
-        return api_error("Unauthorized", 403)
-    
-    data = request.json
+    data = request.get_json(silent=True) or {}
     action = data.get("action")
     target_user_id = data.get("user_id")
     key = data.get("key")
@@ -47,26 +42,16 @@ def api_attributes():
         return api_error(str(e), 500)
 
 @bp.route("/audit")
+@require_role("admin")
 def api_audit_logs():
     # This route mimics the original /api/audit/logs logic
-    if "user_id" not in session or session.get("role") != "admin":
-        return api_error("Unauthorized", 403)
-    
+    limit = request.args.get("limit", type=int)
+    before = request.args.get("before", type=int)
+    if limit is not None and limit <= 0:
+        return api_error("limit must be a positive integer", 400)
+
     try:
-        if not Config.AUDIT_LOG_PATH.exists():
-            return api_success({"logs": []})
-        
-        logs = []
-        with open(Config.AUDIT_LOG_PATH, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line: continue
-                try:
-                    logs.append(json.loads(line))
-                except json.JSONDecodeError:
-                    continue
-        
-        logs.sort(key=lambda x: x.get("timestamp", 0), reverse=True)
+        logs = read_events(limit=limit, before=before)
         return api_success({"logs": logs})
     except Exception as e:
         return api_error(str(e), 500)
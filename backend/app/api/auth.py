@@ -2,14 +2,21 @@
 from flask import Blueprint, request, session, redirect, url_for
 from app.services.storage.users import create_user, verify_password, get_user_by_email, get_user_by_id, get_user_attributes
 from app.services.audit.logger import audit_deny
+from app.services.crypto.keys import generate_user_keys
 from app.services.utils import api_success, api_error
 import os
+import re
 
 bp = Blueprint('auth', __name__, url_prefix='/api')
 
+# local@domain.tld with no whitespace (format only, deliverability is not checked)
+_EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+# Admins are never self-registered
+_SIGNUP_ROLES = frozenset({"patient", "doctor"})
+
 @bp.route("/signup", methods=["POST"])
 def api_signup():
-    data = request.json or {}
+    data = request.get_json(silent=True) or {}
     name = data.get("name")
     email = data.get("email")
     password = data.get("password")
@@ -18,17 +25,17 @@ def api_signup():
     if not email or not password or not role:
         return api_error("email, password, and role are required", 400)
     
-    if role not in ["patient", "doctor"]:
+    # JSON lists/dicts are unhashable and not strings; reject them before the set/regex checks
+    if not isinstance(role, str) or role not in _SIGNUP_ROLES:
         return api_error("Invalid role. Must be patient or doctor", 400)
     
-    if "@" not in email:
+    if not isinstance(email, str) or not _EMAIL_RE.fullmatch(email):
         return api_error("Invalid email format", 400)
     
     try:
         user_id = create_user(email, password, role, name)
         
         # Generate keys for the new user immediately
-        from app.services.crypto.keys import generate_user_keys
         generate_user_keys(user_id)
         
         response_data = {"email": email, "role": role}
@@ -46,7 +53,7 @@ def api_signup():
 
 @bp.route("/login", methods=["POST"])
 def api_login():
-    data = request.json or {}
+    data = request.get_json(silent=True) or {}
     email = data.get("email")
     password = data.get("password")
 
@@ -65,7 +72,9 @@ def api_login():
     session.permanent = True
     session["user_id"] = user_id
     session["role"] = role
-    session.modified = True
+    # Snapshot profile fields so /api/session can answer from the cookie
+    session["name"] = user["name"]
+    session["email"] = user["email"]
 
     return api_success({
         "user": user_id, 
@@ -78,19 +87,24 @@ def api_session():
         return api_error("Unauthorized", 401)
 
     user_id = session["user_id"]
-    user = get_user_by_id(user_id)
-    if not user:
+    # Known users always carry the derived Role attribute, so this doubles as the existence check
+    attributes = get_user_attributes(user_id)
+    if not attributes:
         session.clear()
         return api_error("User not found", 401)
-        
-    attributes = get_user_attributes(user_id)
-    
+
+    if "email" in session:
+        profile = session
+    else:
+        # Older sessions were issued without the profile snapshot
+        profile = get_user_by_id(user_id) or {}
+
     return api_success({
         "authenticated": True,
         "user_id": user_id,
-        "name": user.get("name"),
-        "email": user.get("email"),
-        "role": user.get("role"),
+        "name": profile.get("name"),
+        "email": profile.get("email"),
+        "role": profile.get("role"),
         "attributes": attributes
     })
 
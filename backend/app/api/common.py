@@ -1,14 +1,25 @@
 
-from flask import Blueprint
-from app.services.crypto.keys import get_or_create_srs_key
+from functools import lru_cache
+import hashlib
+from flask import Blueprint, request
+from app.services.crypto.keys import get_srs_public_key_pem
 from app.services.utils import api_success, api_error
 
 bp = Blueprint('common', __name__, url_prefix='/api')
 
+@lru_cache(maxsize=1)
+def _etag_for(public_key_pem):
+    return hashlib.sha256(public_key_pem.encode("utf-8")).hexdigest()
+
 @bp.route("/srs/public-key")
 def api_srs_public_key():
     try:
-        _, public_key_pem = get_or_create_srs_key()
-        return api_success({"public_key": public_key_pem.decode("utf-8")})
+        public_key_pem = get_srs_public_key_pem()
     except Exception as e:
         return api_error(str(e), 500)
+
+    response = api_success({"public_key": public_key_pem})
+    # The key only changes on reset, so clients can revalidate with If-None-Match and get a 304
+    response.set_etag(_etag_for(public_key_pem))
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
@@ -2,7 +2,10 @@
 from flask import Blueprint, session, jsonify, request
 import os
 import shutil
-from app.services.crypto.keys import generate_user_keys, CLOUD_KEYS_USERS
+from app.services.crypto.keys import generate_user_keys, clear_srs_key_cache, CLOUD_KEYS_USERS
+from app.services.storage.db import init_db, remove_db_files
+from app.services.storage.phr import clear_meta_cache
+from app.services.storage.users import invalidate_user_cache
 from app.services.utils import api_success, api_error
 from config import Config
 
@@ -33,6 +36,7 @@ def api_reset():
         if Config.CLOUD_META.exists():
             shutil.rmtree(Config.CLOUD_META)
             Config.CLOUD_META.mkdir()
+        clear_meta_cache()
             
         # Clear Keys (SRS and Users)
         if Config.CLOUD_KEYS_SRS.exists():
@@ -42,18 +46,17 @@ def api_reset():
         if Config.CLOUD_KEYS_USERS.exists():
             shutil.rmtree(Config.CLOUD_KEYS_USERS)
             Config.CLOUD_KEYS_USERS.mkdir()
+        clear_srs_key_cache()
             
         # Clear Audit Logs
-        if Config.AUDIT_LOG_PATH.exists():
-            os.remove(Config.AUDIT_LOG_PATH)
+        Config.AUDIT_LOG_PATH.unlink(missing_ok=True)
             
         # Clear Database
-        if Config.DB_PATH.exists():
-            os.remove(Config.DB_PATH)
+        remove_db_files()
             
         # Re-initialize Database
-        from app.services.storage.db import init_db
         init_db()
+        invalidate_user_cache()
 
         return api_success({"message": "System reset successfully"})
     except Exception as e:
@@ -1,119 +1,72 @@
 
-from flask import Blueprint, request, session, send_file
+from flask import Blueprint, request, session, send_from_directory, current_app
+from urllib.parse import quote
+from werkzeug.exceptions import NotFound
+from werkzeug.security import safe_join
 import os
-import json
+import unicodedata
 from types import SimpleNamespace
 from app.services.crypto.ops import re_encrypt_key
 from app.services.policy.parser import evaluate_policy
+from app.services.storage.phr import load_meta, list_indexed_phrs, display_name, meta_path_for
 from app.services.storage.users import get_user_by_id, get_user_attributes
 from app.services.audit.logger import audit_deny, log_event
-from app.services.utils import api_success, api_error
+from app.services.utils import api_success, api_error, require_role
 from config import Config
 
 bp = Blueprint('doctor', __name__, url_prefix='/api/doctor')
 
 @bp.route("/files")
+@require_role("doctor")
 def api_files():
-    if "user_id" not in session:
-        return api_error("Unauthorized", 401)
-    
-    if session.get("role") != "doctor":
-        return api_error("Forbidden", 403)
-
     files = []
-    if Config.CLOUD_DATA.exists():
-        for enc_filename in os.listdir(Config.CLOUD_DATA):
-            if not enc_filename.endswith(".enc"):
-                continue
-            
-            meta_filename = enc_filename.replace(".enc", ".json")
-            meta_path = Config.CLOUD_META / meta_filename
-            
-            if meta_path.exists():
-                try:
-                    with open(meta_path, "r") as f:
-                        meta = json.load(f)
-                    
-                    original_filename = enc_filename.replace(".enc", "")
-                    
-                    # Get modification time and size
-                    file_path = Config.CLOUD_DATA / enc_filename
-                    mtime = os.path.getmtime(file_path)
-                    size = os.path.getsize(file_path)
-                    
-                    files.append({
-                        "filename": original_filename,
-                        "enc_filename": enc_filename,
-                        "owner": meta.get("owner", "Unknown"),
-                        "date": mtime,
-                        "size": size,
-                        "policy": meta.get("policy", "N/A"),
-                        "iv": meta.get("iv", "N/A"),
-                        "key_blob": meta.get("key_blob", "N/A"),
-                        "algorithm": "AES-GCM-256 + RSA-OAEP"
-                    })
-                except (json.JSONDecodeError, IOError):
-                    continue
-            else:
-                original_filename = enc_filename.replace(".enc", "")
-                file_path = Config.CLOUD_DATA / enc_filename
-                mtime = os.path.getmtime(file_path)
-                size = os.path.getsize(file_path)
-                
-                files.append({
-                    "filename": original_filename,
-                    "owner": None,
-                    "date": mtime,
-                    "size": size,
-                    "policy": None
-                })
+    for phr in list_indexed_phrs():
+        files.append({
+            "filename": display_name(phr["file"]),
+            "enc_filename": phr["file"],
+            "owner": phr["owner"] or "Unknown",
+            "date": phr["mtime"],
+            "size": phr["size"],
+            "policy": phr["policy"] or "N/A",
+            "iv": phr["iv"] or "N/A",
+            "key_blob": phr["key_blob"] or "N/A",
+            "algorithm": "AES-GCM-256 + RSA-OAEP"
+        })
 
     return api_success({"files": files})
 
 @bp.route("/access", methods=["POST"])
+@require_role("doctor")
 def api_access():
-    if "user_id" not in session:
-        return api_error("Unauthorized", 401)
-    
-    if session.get("role") != "doctor":
-        return api_error("Forbidden", 403)
-
-    data = request.json
+    user_id = session["user_id"]
+    data = request.get_json(silent=True) or {}
     filename = data.get("file")
     
     if not filename:
         return api_error("file parameter required", 400)
     
-    # Normalize filename
-    meta_filename = filename if filename.endswith(".json") else f"{filename}.json"
-    if not meta_filename.endswith(".json"):
-         meta_filename = meta_filename.replace(".enc", ".json")
-         
-    meta_path = Config.CLOUD_META / meta_filename
-    if not meta_path.exists():
-        meta_path = Config.CLOUD_META / f"{filename}.json"
-        if not meta_path.exists():
-            return api_error("File metadata not found", 404)
-
     try:
-        with open(meta_path, "r") as f:
-            meta = json.load(f)
+        # Accepts the display, .enc or .json name; the stat in load_meta doubles as the existence check
+        try:
+            meta = load_meta(meta_path_for(filename))
+        except FileNotFoundError:
+            return api_error("File metadata not found", 404)
             
-        doctor_user_data = get_user_by_id(session["user_id"])
+        doctor_user_data = get_user_by_id(user_id)
         if not doctor_user_data:
              return api_error("User not found", 404)
         
         doctor_user = SimpleNamespace(**doctor_user_data)
-        doctor_user.attributes = get_user_attributes(session["user_id"])
+        doctor_user.attributes = get_user_attributes(user_id)
         
         # 1. Policy
         if not evaluate_policy(doctor_user, meta["policy"]):
-            audit_deny(session["user_id"], filename, "DENIED_POLICY")
+            audit_deny(user_id, filename, "DENIED_POLICY")
             return api_error("Access denied: policy not satisfied", 403)
 
         # 2. Revocation
-        if session["user_id"] in meta.get("revoked_users", []):
-            audit_deny(session["user_id"], filename, "DENIED_REVOKED")
+        if user_id in meta.get("revoked_users", []):
+            audit_deny(user_id, filename, "DENIED_REVOKED")
             return api_error("Access denied: You have been revoked by the owner", 403)
 
         # 3. Re-Encryption
@@ -124,9 +77,9 @@ def api_access():
             if not key_blob:
                 return api_error("Key blob missing in metadata", 500)
                 
-            re_encrypted_key = re_encrypt_key(key_blob, session["user_id"])
+            re_encrypted_key = re_encrypt_key(key_blob, user_id)
                 
-            log_event(session["user_id"], filename, "ACCESS", "GRANTED_RE_ENCRYPT")
+            log_event(user_id, filename, "ACCESS", "GRANTED_RE_ENCRYPT")
 
             return api_success({
                 "status": "granted",
@@ -142,13 +95,41 @@ def api_access():
     except Exception as e:
         return api_error(str(e), 500)
 
+def _attachment_names(filename):
+    """
+    Content-Disposition filename parameters, built the way Werkzeug's send_file does:
+    a plain filename for ASCII names, plus an RFC 5987 filename* only when needed.
+    """
+    try:
+        filename.encode("ascii")
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize("NFKD", filename).encode("ascii", "ignore").decode("ascii")
+        return {"filename": simple, "filename*": f"UTF-8''{quote(filename, safe='!#$&+-.^_`|~')}"}
+    return {"filename": filename}
+
 @bp.route("/download/<filename>")
+@require_role("doctor")
 def api_download_file(filename):
-    if session.get("role") != "doctor":
-        return api_error("Unauthorized", 403)
+    accel_prefix = current_app.config.get("X_ACCEL_REDIRECT_PREFIX")
+    if accel_prefix:
+        # Same checks send_from_directory makes: stay inside cloud/data, regular files only
+        file_path = safe_join(str(Config.CLOUD_DATA), filename)
+        if file_path is None or not os.path.isfile(file_path):
+            return api_error("File not found", 404)
+
+        # nginx serves the bytes itself (sendfile, Range, caching); we only authorize
+        response = current_app.response_class(status=200)
+        response.headers["X-Accel-Redirect"] = accel_prefix.rstrip("/") + "/" + quote(filename)
+        # Same header as the send_from_directory path, which the frontend parses for the save name
+        response.headers.set("Content-Disposition", "attachment", **_attachment_names(filename))
+        # Let nginx pick the type from the file instead of our empty body's default
+        del response.headers["Content-Type"]
+        return response
         
-    file_path = Config.CLOUD_DATA / filename
-    if not file_path.exists():
+    # send_from_directory rejects paths escaping cloud/data and hands the open file to the
+    # server's wsgi.file_wrapper (sendfile where supported); conditional=True answers
+    # If-None-Match / Range requests (resumable downloads) without resending the body
+    try:
+        return send_from_directory(Config.CLOUD_DATA, filename, as_attachment=True, conditional=True)
+    except NotFound:
         return api_error("File not found", 404)
-        
-    return send_file(file_path, as_attachment=True)
@@ -1,74 +1,36 @@
 
 from flask import Blueprint, request, session
-import os
 import json
 import sys
-from app.services.storage.phr import store_encrypted_phr
+from app.services.storage.phr import store_encrypted_phr, load_meta, write_meta, set_indexed_policy, list_indexed_phrs, display_name, meta_path_for
 from app.services.audit.logger import audit_deny
 from app.services.audit.logger import log_event
-from app.services.utils import api_success, api_error
-from config import Config
+from app.services.utils import api_success, api_error, require_role
 
 bp = Blueprint('patient', __name__, url_prefix='/api/patient')
 
 @bp.route("/files")
+@require_role("patient")
 def api_files():
-    if "user_id" not in session:
-        audit_deny("anonymous", None, "DENIED_AUTH")
-        return api_error("Unauthorized", 401)
-    
-    if session.get("role") != "patient":
-        audit_deny(session.get("user_id", "unknown"), None, "DENIED_ROLE")
-        return api_error("Forbidden: patient role required", 403)
-
     files = []
-    # Use Config paths
-    if Config.CLOUD_META.exists():
-        for meta_filename in os.listdir(Config.CLOUD_META):
-            if not meta_filename.endswith(".json"):
-                continue
-            
-            meta_path = Config.CLOUD_META / meta_filename
-            try:
-                with open(meta_path, "r") as f:
-                    meta = json.load(f)
-                
-                original_filename = meta.get("file", meta_filename).replace(".enc", "")
-                if original_filename == meta_filename:
-                    original_filename = meta_filename.replace(".json", "")
-                
-                owner = meta.get("owner", None)
-                if not owner and "test_patient" in meta_filename:
-                     owner = "test_patient_mod2"
-
-                # Get modification time and size
-                file_path = Config.CLOUD_DATA / meta.get("file", meta_filename.replace(".json", ".enc"))
-                mtime = 0
-                size = 0
-                if file_path.exists():
-                     mtime = os.path.getmtime(file_path)
-                     size = os.path.getsize(file_path)
-
-                files.append({
-                    "filename": original_filename.replace(".enc", "").replace(".json", ""),
-                    "owner": owner,
-                    "date": mtime,
-                    "size": size,
-                    "policy": meta.get("policy", None),
-                    "iv": meta.get("iv", "N/A"),
-                    "key_blob": meta.get("key_blob", "N/A"),
-                    "algorithm": "AES-GCM-256 + RSA-OAEP"
-                })
-            except (json.JSONDecodeError, IOError):
-                continue
+    for phr in list_indexed_phrs(owner=session["user_id"]):
+        files.append({
+            "filename": display_name(phr["file"]),
+            "owner": phr["owner"],
+            "date": phr["mtime"],
+            "size": phr["size"],
+            "policy": phr["policy"],
+            "iv": phr["iv"] or "N/A",
+            "key_blob": phr["key_blob"] or "N/A",
+            "algorithm": "AES-GCM-256 + RSA-OAEP"
+        })
 
     return api_success({"files": files})
 
 @bp.route("/upload", methods=["POST"])
+@require_role("patient")
 def api_upload():
-    if session.get("role") != "patient":
-        return {"error": "unauthorized"}, 403
-
+    user_id = session["user_id"]
     file = request.files["file"]
     policy = request.form["policy"]
     key_blob = request.form.get("key_blob")
@@ -77,52 +39,45 @@ def api_upload():
     if not key_blob or not iv:
         return api_error("Missing encryption parameters (key_blob or iv)", 400)
 
-    store_encrypted_phr(session["user_id"], file, policy, key_blob, iv)
+    store_encrypted_phr(user_id, file, policy, key_blob, iv)
 
     return api_success({
         "message": "File uploaded successfully",
-        "filename": file.filename.replace(".enc", "").replace(".json", ""),
+        "filename": display_name(file.filename),
         "policy": policy,
-        "owner": session["user_id"],
+        "owner": user_id,
         "iv": iv,
         "key_blob": key_blob,
         "algorithm": "AES-GCM-256 + RSA-OAEP"
     })
 
 @bp.route("/revoke", methods=["POST"])
+@require_role("patient")
 def api_revoke():
-    if "user_id" not in session:
-        return api_error("Unauthorized", 401)
-    
-    if session.get("role") != "patient":
-        return api_error("Forbidden", 403)
-    
-    data = request.json or {}
+    user_id = session["user_id"]
+    data = request.get_json(silent=True) or {}
     filename = data.get("filename")
     
     if not filename:
         return api_error("Filename required", 400)
     
-    meta_filename = filename if filename.endswith(".json") else f"{filename}.json"
-    meta_path = Config.CLOUD_META / meta_filename
-    
-    if not meta_path.exists():
+    meta_path = meta_path_for(filename)
+    try:
+        meta = load_meta(meta_path)
+    except FileNotFoundError:
         return api_error("File not found", 404)
     
-    with open(meta_path, "r") as f:
-        meta = json.load(f)
-    
-    if meta.get("owner") != session["user_id"]:
-        audit_deny(session["user_id"], filename, "DENIED_OWNER")
+    if meta.get("owner") != user_id:
+        audit_deny(user_id, filename, "DENIED_OWNER")
         return api_error("Forbidden: not file owner", 403)
     
     revoke_user_id = data.get("revoke_user_id")
     if revoke_user_id:
-        revoked_list = meta.get("revoked_users", [])
+        revoked_list = list(meta.get("revoked_users", []))
         if revoke_user_id not in revoked_list:
             revoked_list.append(revoke_user_id)
         meta["revoked_users"] = revoked_list
-        log_event(session["user_id"], filename, "REVOKE_USER", f"Revoked {revoke_user_id}")
+        log_event(user_id, filename, "REVOKE_USER", f"Revoked {revoke_user_id}")
     else:
         meta["policy"] = "Role:__REVOKED__"
         try:
@@ -132,9 +87,11 @@ def api_revoke():
         except Exception as e:
             print(f"REVOCATION WARNING: {e}", file=sys.stderr)
         
-        log_event(session["user_id"], filename, "REVOKE", "SUCCESS")
+        log_event(user_id, filename, "REVOKE", "SUCCESS")
     
-    with open(meta_path, "w") as f:
-        json.dump(meta, f, indent=2)
+    write_meta(meta_path, meta)
+    # Per-user revocations live only in the metadata; a full revoke also changes the listed policy
+    if not revoke_user_id:
+        set_indexed_policy(meta.get("file", f"{display_name(filename)}.enc"), meta["policy"])
     
     return api_success({"status": "revoked", "filename": filename})
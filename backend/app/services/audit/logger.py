@@ -1,7 +1,15 @@
 import hashlib
 import json
 import os
+import threading
 import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
 from config import Config
 
@@ -11,32 +19,132 @@ LOG_FILE = Config.AUDIT_LOG_PATH
 if not LOG_FILE.parent.exists():
     LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
 
+# Serializes read-last-hash + append between this process's threads; _chain_lock adds an
+# OS file lock so other worker processes (and CLI scripts) are serialized too
+_write_lock = threading.Lock()
+# (path, size, mtime_ns, hash) of the log right after this process's last append
+_last_append = None
+
+
+def _previous_hash():
+    """Hash of the newest entry, reusing our own last append if the file hasn't changed since."""
+    try:
+        st = os.stat(LOG_FILE)
+    except FileNotFoundError:
+        return ""
+
+    if _last_append is not None and _last_append[:3] == (str(LOG_FILE), st.st_size, st.st_mtime_ns):
+        return _last_append[3]
+
+    # Another process appended (or the log was replaced): read the last line from the tail
+    last_line = next(_iter_lines_reversed(LOG_FILE, block_size=4096), None)
+    if last_line:
+        return json.loads(last_line)["hash"]
+    return ""
+
+
+@contextmanager
+def _chain_lock():
+    """Hold the audit chain exclusively across threads and processes."""
+    with _write_lock:
+        # A sidecar lock file, so the log itself stays readable while locked (Windows locks are mandatory)
+        lock_path = LOG_FILE.with_name(LOG_FILE.name + ".lock")
+        with open(lock_path, "a+b") as lock_file:
+            fd = lock_file.fileno()
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
 
 def log_event(user_id, file_name, action, status):
-    timestamp = int(time.time())
-
-    prev_hash = ""
-    if os.path.exists(LOG_FILE):
-        with open(LOG_FILE, "r") as f:
-            lines = f.readlines()
-            if lines:
-                prev_hash = json.loads(lines[-1])["hash"]
-
-    entry = {
-        "timestamp": timestamp,
-        "user": user_id,
-        "file": file_name,
-        "action": action,
-        "status": status,
-        "prev_hash": prev_hash
-    }
-
-    raw = json.dumps(entry, sort_keys=True).encode()
-    entry_hash = hashlib.sha256(raw).hexdigest()
-    entry["hash"] = entry_hash
-
-    with open(LOG_FILE, "a") as f:
-        f.write(json.dumps(entry) + "\n")
+    global _last_append
+    with _chain_lock():
+        # Taken under the lock so timestamps stay non-decreasing in file order (read_events relies on it)
+        timestamp = int(time.time())
+        prev_hash = _previous_hash()
+
+        entry = {
+            "timestamp": timestamp,
+            "user": user_id,
+            "file": file_name,
+            "action": action,
+            "status": status,
+            "prev_hash": prev_hash
+        }
+
+        raw = json.dumps(entry, sort_keys=True).encode()
+        entry_hash = hashlib.sha256(raw).hexdigest()
+        entry["hash"] = entry_hash
+
+        # Written synchronously (not batched) so a crash never drops an audited action
+        with open(LOG_FILE, "ab") as f:
+            f.write((json.dumps(entry) + "\n").encode())
+            f.flush()
+            st = os.fstat(f.fileno())
+        _last_append = (str(LOG_FILE), st.st_size, st.st_mtime_ns, entry_hash)
+
+
+def _iter_lines_reversed(path, block_size=64 * 1024):
+    """Yield the non-empty lines of a file, last line first, reading fixed-size blocks from EOF."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        tail = b""
+        while pos > 0:
+            step = min(block_size, pos)
+            pos -= step
+            f.seek(pos)
+            lines = (f.read(step) + tail).split(b"\n")
+            # The first piece may be a partial line; carry it into the next block
+            tail = lines.pop(0)
+            for line in reversed(lines):
+                line = line.strip()
+                if line:
+                    yield line
+        tail = tail.strip()
+        if tail:
+            yield tail
+
+
+def read_events(limit=None, before=None):
+    """
+    Read audit entries newest-first.
+
+    The log is append-only with non-decreasing timestamps, so it is scanned
+    backwards from EOF and reading stops as soon as `limit` entries are collected.
+
+    Args:
+        limit: Maximum number of entries to return (None for all)
+        before: Only return entries with timestamp < before (None for no bound)
+
+    Returns:
+        List of entry dicts, newest first
+    """
+    if not os.path.exists(LOG_FILE):
+        return []
+
+    events = []
+    for line in _iter_lines_reversed(LOG_FILE):
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if before is not None and entry.get("timestamp", 0) >= before:
+            continue
+        events.append(entry)
+        if limit is not None and len(events) >= limit:
+            break
+    return events
 
 
 def audit_deny(user, file, reason):
@@ -1,4 +1,4 @@
-import os
+import threading
 from Crypto.PublicKey import RSA
 
 from config import Config
@@ -6,6 +6,8 @@ from config import Config
 # Define paths for key storage
 CLOUD_KEYS_SRS = Config.CLOUD_KEYS_SRS
 CLOUD_KEYS_USERS = Config.CLOUD_KEYS_USERS
+SRS_PRIVATE_KEY_PATH = CLOUD_KEYS_SRS / "srs_private.pem"
+SRS_PUBLIC_KEY_PATH = CLOUD_KEYS_SRS / "srs_public.pem"
 
 # Ensure directories exist
 for directory in [CLOUD_KEYS_SRS, CLOUD_KEYS_USERS]:
@@ -13,19 +15,55 @@ for directory in [CLOUD_KEYS_SRS, CLOUD_KEYS_USERS]:
     if not directory.exists():
         directory.mkdir(parents=True, exist_ok=True)
 
+# (stamp, private_key, public_key_pem_bytes, public_key_pem_str) for the SRS pair on disk.
+# The stamp is the key files' stat identity, so the pair is reloaded (or regenerated) when
+# they change or disappear, e.g. after reset.py runs in another process.
+_srs_key_cache = None
+# Serializes loads so concurrent requests never generate two different pairs
+_srs_key_lock = threading.Lock()
+
+def _srs_key_stamp():
+    try:
+        priv = SRS_PRIVATE_KEY_PATH.stat()
+        pub = SRS_PUBLIC_KEY_PATH.stat()
+    except FileNotFoundError:
+        return None
+    return (
+        priv.st_ino, priv.st_mtime_ns, priv.st_size,
+        pub.st_ino, pub.st_mtime_ns, pub.st_size
+    )
+
+def _current_srs_keys():
+    """Cache entry for the SRS pair currently on disk (two stats when nothing changed)."""
+    global _srs_key_cache
+    cached = _srs_key_cache
+    stamp = _srs_key_stamp()
+    if cached is None or stamp is None or cached[0] != stamp:
+        with _srs_key_lock:
+            stamp = _srs_key_stamp()
+            if _srs_key_cache is None or stamp is None or _srs_key_cache[0] != stamp:
+                private_key, public_key_pem = _load_or_generate_srs_key()
+                _srs_key_cache = (
+                    _srs_key_stamp(), private_key, public_key_pem, public_key_pem.decode("utf-8")
+                )
+            cached = _srs_key_cache
+    return cached
+
 def get_or_create_srs_key():
     """
-    Check for SRS keys on disk. If missing, generate new pair.
+    Return the SRS key pair, loading it from disk (or generating it) when the files change.
     Returns: (private_key_obj, public_key_pem_bytes)
     """
-    priv_path = os.path.join(CLOUD_KEYS_SRS, "srs_private.pem")
-    pub_path = os.path.join(CLOUD_KEYS_SRS, "srs_public.pem")
-
-    if os.path.exists(priv_path) and os.path.exists(pub_path):
-        with open(priv_path, "rb") as f:
-            private_key = RSA.import_key(f.read())
-        with open(pub_path, "rb") as f:
-            public_key_pem = f.read()
+    _, private_key, public_key_pem, _ = _current_srs_keys()
+    return private_key, public_key_pem
+
+def _load_or_generate_srs_key():
+    """
+    Check for SRS keys on disk. If missing, generate new pair.
+    """
+    if SRS_PRIVATE_KEY_PATH.exists() and SRS_PUBLIC_KEY_PATH.exists():
+        private_key = RSA.import_key(SRS_PRIVATE_KEY_PATH.read_bytes())
+        public_key_pem = SRS_PUBLIC_KEY_PATH.read_bytes()
         return private_key, public_key_pem
 
     # Generate new pair
@@ -34,14 +72,23 @@ def get_or_create_srs_key():
     public_key = key.publickey().export_key()
     private_key_pem = key.export_key()
 
-    with open(priv_path, "wb") as f:
-        f.write(private_key_pem)
-    
-    with open(pub_path, "wb") as f:
-        f.write(public_key)
+    SRS_PRIVATE_KEY_PATH.write_bytes(private_key_pem)
+    SRS_PUBLIC_KEY_PATH.write_bytes(public_key)
 
     return private_key, public_key
 
+def get_srs_public_key_pem():
+    """
+    Return the SRS public key as a PEM string, re-reading it only when the key files change.
+    """
+    return _current_srs_keys()[3]
+
+def clear_srs_key_cache():
+    """Forget the cached SRS keys (call after the key files are deleted)."""
+    global _srs_key_cache
+    with _srs_key_lock:
+        _srs_key_cache = None
+
 def generate_user_keys(user_id):
     """
     Generate RSA keypair for a specific user.
@@ -53,8 +100,8 @@ def generate_user_keys(user_id):
     private_pem = key.export_key(pkcs=8)
     public_pem = key.publickey().export_key()
 
-    priv_path = os.path.join(CLOUD_KEYS_USERS, f"{user_id}_private.pem")
-    pub_path = os.path.join(CLOUD_KEYS_USERS, f"{user_id}_public.pem")
+    priv_path = CLOUD_KEYS_USERS / f"{user_id}_private.pem"
+    pub_path = CLOUD_KEYS_USERS / f"{user_id}_public.pem"
     
     print(f"DEBUG: Writing to {priv_path}")
 
@@ -73,8 +120,8 @@ def get_user_public_key(user_id):
     Retrieve user's public key from disk.
     Returns bytes or None if not found.
     """
-    pub_path = os.path.join(CLOUD_KEYS_USERS, f"{user_id}_public.pem")
-    if os.path.exists(pub_path):
-        with open(pub_path, "rb") as f:
-            return f.read()
-    return None
+    pub_path = CLOUD_KEYS_USERS / f"{user_id}_public.pem"
+    try:
+        return pub_path.read_bytes()
+    except FileNotFoundError:
+        return None
@@ -1,13 +1,12 @@
 import json
-import os
-import sys
-import json
-import os
 import sys
+from types import SimpleNamespace
 from app.services.crypto.aes import decrypt_file
 from app.services.crypto.cpabe.core import decrypt_aes_key
 from app.services.policy.parser import evaluate_policy
 from app.services.audit.logger import log_event
+from app.services.storage.phr import meta_path_for
+from app.services.storage.users import get_user_attributes
 from config import Config
 
 CLOUD_DATA = Config.CLOUD_DATA
@@ -20,7 +19,7 @@ def access_phr(user_id, enc_file, output_path):
     # We should probably update this to support Hybrid or just fix imports for legacy.
     # Fixing imports for now.
     
-    meta_path = CLOUD_META / enc_file.replace(".enc", ".json")
+    meta_path = meta_path_for(enc_file)
 
     if not meta_path.exists():
         log_event(user_id, enc_file, "ACCESS", "INVALID_REQUEST")
@@ -31,11 +30,9 @@ def access_phr(user_id, enc_file, output_path):
 
     try:
         # Load user attributes dynamically
-        from app.services.storage.users import get_user_attributes
         attrs = get_user_attributes(user_id)
         
         # Create user object for policy evaluation
-        from types import SimpleNamespace
         user = SimpleNamespace(user_id=user_id, attributes=attrs)
         
         # Note: decrypt_aes_key (CP-ABE) is used here. 
@@ -45,7 +42,7 @@ def access_phr(user_id, enc_file, output_path):
         log_event(user_id, enc_file, "ACCESS", "DENIED_POLICY")
         raise PermissionError("Access denied: policy not satisfied")
 
-    enc_path = os.path.join(CLOUD_DATA, enc_file)
+    enc_path = CLOUD_DATA / enc_file
     decrypt_file(enc_path, output_path, aes_key)
 
     log_event(user_id, enc_file, "ACCESS", "GRANTED")
@@ -1,28 +1,158 @@
+import atexit
+import queue
 import sqlite3
 import os
+import threading
 
 from config import Config
 
 DB_PATH = Config.DB_PATH
 
+# Applied to every new connection:
+# - WAL lets readers proceed while a write is in flight
+# - NORMAL sync is durable under WAL except for the last commits on power loss,
+#   and skips an fsync per transaction
+# - busy_timeout waits for the writer lock instead of failing with "database is locked"
+# - ~20MB page cache and in-memory temp tables keep sorts/joins off disk
+# - foreign_keys is per-connection in SQLite, so enforce it here rather than only in init_db
+_CONNECTION_PRAGMAS = """
+PRAGMA journal_mode = WAL;
+PRAGMA synchronous = NORMAL;
+PRAGMA busy_timeout = 5000;
+PRAGMA cache_size = -20000;
+PRAGMA temp_store = MEMORY;
+PRAGMA foreign_keys = ON;
+"""
+
+# Idle connections kept open per process; extra ones are closed when released
+POOL_SIZE = os.cpu_count() or 4
+
+_pool = queue.LifoQueue(maxsize=POOL_SIZE)
+_pool_lock = threading.Lock()
+# Bumped by close_all_connections so connections checked out before a reset
+# are discarded on release instead of going back into the pool
+_pool_generation = 0
+# Connections opened by a parent process before fork(). SQLite handles must not be used
+# across fork, and even closing one would run SQLite cleanup against the parent's locks
+# and WAL state, so they are only kept referenced here and never touched again.
+_inherited = []
+
+
+class _PooledConnection(sqlite3.Connection):
+    """Connection whose close() hands it back to the pool instead of closing it."""
+
+    def close(self):
+        _release(self)
+
+
+def _discard(conn):
+    if conn.pid == os.getpid():
+        sqlite3.Connection.close(conn)
+    else:
+        _inherited.append(conn)
+
+
+def _release(conn):
+    if conn.pid != os.getpid():
+        # Checked out in the parent at fork time
+        _inherited.append(conn)
+        return
+
+    # Drop any transaction the caller left open so the next user starts clean
+    try:
+        conn.rollback()
+    except sqlite3.Error:
+        _discard(conn)
+        return
+
+    with _pool_lock:
+        if conn.generation == _pool_generation:
+            try:
+                _pool.put_nowait(conn)
+                return
+            except queue.Full:
+                pass
+    _discard(conn)
+
+
+def _db_file_id():
+    """(st_dev, st_ino) of the database file, or None if it does not exist."""
+    try:
+        st = os.stat(DB_PATH)
+    except FileNotFoundError:
+        return None
+    return (st.st_dev, st.st_ino)
+
 
 def get_connection():
+    # A pooled handle keeps the file it was opened on, even after another process
+    # (e.g. reset.py) deletes and recreates the database. While that handle is open the
+    # old inode stays allocated, so a replaced file always has a different identity.
+    file_id = _db_file_id()
+    pid = os.getpid()
+    while True:
+        try:
+            conn = _pool.get_nowait()
+        except queue.Empty:
+            break
+        if conn.file_id == file_id and conn.pid == pid:
+            return conn
+        _discard(conn)
+
     # Ensure directory exists just in case (e.g. fresh clone/restructure)
     if not DB_PATH.parent.exists():
         DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-    return sqlite3.connect(str(DB_PATH))
+    # Pooled connections move between request threads, but only one uses it at a time
+    conn = sqlite3.connect(str(DB_PATH), factory=_PooledConnection, check_same_thread=False)
+    conn.executescript(_CONNECTION_PRAGMAS)
+    conn.generation = _pool_generation
+    conn.file_id = _db_file_id()
+    conn.pid = pid
+    return conn
+
+
+def close_all_connections():
+    """Close every pooled connection, e.g. before the database file is removed."""
+    global _pool_generation
+    with _pool_lock:
+        _pool_generation += 1
+        while True:
+            try:
+                conn = _pool.get_nowait()
+            except queue.Empty:
+                break
+            _discard(conn)
+
+
+def _reset_pool_in_child():
+    # create_app opens (and pools) connections at import time, so a pre-fork server
+    # (e.g. gunicorn --preload) would otherwise hand the parent's handles to workers
+    global _pool, _pool_lock, _pool_generation
+    _inherited.append(_pool)
+    _pool = queue.LifoQueue(maxsize=POOL_SIZE)
+    _pool_lock = threading.Lock()
+    _pool_generation += 1
+
+
+atexit.register(close_all_connections)
+if hasattr(os, "register_at_fork"):  # not available on Windows
+    os.register_at_fork(after_in_child=_reset_pool_in_child)
+
+
+def remove_db_files():
+    """Delete the database file along with any WAL/shared-memory sidecars."""
+    close_all_connections()
+    for suffix in ("", "-wal", "-shm"):
+        DB_PATH.with_name(DB_PATH.name + suffix).unlink(missing_ok=True)
 
 
 def init_db():
     # Ensure storage directory exists
-    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
     
     conn = get_connection()
     cur = conn.cursor()
 
-    # Enable foreign keys
-    cur.execute("PRAGMA foreign_keys = ON")
-
     # Users Table (New Schema)
     # user_id: UUID string
     cur.execute("""
@@ -47,5 +177,22 @@ def init_db():
     )
     """)
 
+    # PHR metadata index (cloud/meta JSON stays the source of truth)
+    # filename: stored .enc name in cloud/data; size/mtime describe that file
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS phr_meta (
+        filename TEXT PRIMARY KEY,
+        owner TEXT,
+        policy TEXT,
+        mode TEXT,
+        key_blob TEXT,
+        iv TEXT,
+        size INTEGER NOT NULL,
+        mtime REAL NOT NULL
+    )
+    """)
+    # Per-patient listings: seek by owner and read rows already in upload order
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_phr_owner ON phr_meta(owner, mtime)")
+
     conn.commit()
     conn.close()
@@ -1,12 +1,25 @@
 import json
 import os
 import shutil
+import stat
+import tempfile
 
+from app.services.storage.db import get_connection
 from config import Config
 
 CLOUD_DATA = Config.CLOUD_DATA
 CLOUD_META = Config.CLOUD_META
 
+# Parsed metadata keyed by path, reused while the file's mtime/size are unchanged
+_META_CACHE = {}
+
+# Shared encoder for metadata files (json.dump builds a new one per call when indent is set)
+_META_ENCODER = json.JSONEncoder(indent=2)
+
+# Process umask, read once at import (os.umask can only be read by setting it, which races threads)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
 
 def store_phr(owner_id, file_path, policy):
     """Legacy wrapper for backward compatibility if needed, or deprecate."""
@@ -15,6 +28,221 @@ def store_phr(owner_id, file_path, policy):
     # We should probably remove this or raise deprecation warning.
     raise NotImplementedError("Server-side encryption is deprecated. Use store_encrypted_phr.")
 
+def display_name(filename):
+    """Strip the storage suffix (.json metadata, .enc data) to get the name shown to users."""
+    return filename.removesuffix(".json").removesuffix(".enc")
+
+def meta_path_for(filename):
+    """Metadata path for a PHR given its display, .enc or .json name."""
+    return CLOUD_META / f"{display_name(filename)}.json"
+
+def load_meta(meta_path, stat_result=None):
+    """
+    Load a PHR metadata file, reusing the parsed copy while the file is unchanged.
+
+    Args:
+        meta_path: Path to the metadata JSON file
+        stat_result: Optional os.stat_result for meta_path (e.g. from os.scandir)
+
+    Returns:
+        Shallow copy of the metadata dict
+    """
+    if stat_result is None:
+        stat_result = os.stat(meta_path)
+    stamp = (stat_result.st_mtime_ns, stat_result.st_size)
+
+    key = str(meta_path)
+    cached = _META_CACHE.get(key)
+    if cached is None or cached[0] != stamp:
+        with open(meta_path, "r") as f:
+            cached = (stamp, json.load(f))
+        _META_CACHE[key] = cached
+    return dict(cached[1])
+
+def write_meta(meta_path, meta):
+    """
+    Serialize metadata in one encode and swap it into place atomically.
+
+    The document is written to a temp file in the same directory, fsynced and renamed
+    over meta_path, so readers never see a truncated or half-written file and a crash
+    leaves either the old or the new document. The file keeps its previous permissions
+    (new files get the usual 0666 & ~umask).
+    """
+    data = _META_ENCODER.encode(meta)
+    meta_dir = os.path.dirname(meta_path) or "."
+    try:
+        mode = stat.S_IMODE(os.stat(meta_path).st_mode)
+    except FileNotFoundError:
+        mode = 0o666 & ~_UMASK
+
+    fd, tmp_path = tempfile.mkstemp(dir=meta_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            # mkstemp creates the file 0600
+            if hasattr(os, "fchmod"):
+                os.fchmod(f.fileno(), mode)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, meta_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    _fsync_dir(meta_dir)
+    invalidate_meta(meta_path)
+
+def _fsync_dir(path):
+    """Persist a rename inside path (directories cannot be opened for fsync on Windows)."""
+    if os.name == "nt":
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def invalidate_meta(meta_path):
+    _META_CACHE.pop(str(meta_path), None)
+
+def clear_meta_cache():
+    _META_CACHE.clear()
+
+def scan_dir(path):
+    """List a directory's entries in one scandir pass; a missing directory yields no entries."""
+    try:
+        with os.scandir(path) as it:
+            return list(it)
+    except FileNotFoundError:
+        return []
+
+def _index_row(meta, data_stat):
+    return (
+        meta["file"],
+        meta.get("owner"),
+        meta.get("policy"),
+        meta.get("mode"),
+        meta.get("key_blob"),
+        meta.get("iv"),
+        data_stat.st_size,
+        data_stat.st_mtime
+    )
+
+_INDEX_UPSERT = (
+    "INSERT OR REPLACE INTO phr_meta (filename, owner, policy, mode, key_blob, iv, size, mtime) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+def index_phr(meta, data_stat=None):
+    """
+    Upsert a file's row in the phr_meta index from its metadata.
+
+    Args:
+        meta: Metadata dict as written to cloud/meta
+        data_stat: Optional os.stat_result of the .enc file (looked up when omitted)
+    """
+    if data_stat is None:
+        try:
+            data_stat = (CLOUD_DATA / meta["file"]).stat()
+        except (KeyError, FileNotFoundError):
+            # Same rule as rebuild_phr_index: no data file, nothing to list
+            return
+
+    conn = get_connection()
+    try:
+        conn.execute(_INDEX_UPSERT, _index_row(meta, data_stat))
+        conn.commit()
+    finally:
+        conn.close()
+
+def set_indexed_policy(filename, policy):
+    """Update a file's policy in the phr_meta index (e.g. after the owner revokes it)."""
+    conn = get_connection()
+    try:
+        conn.execute("UPDATE phr_meta SET policy = ? WHERE filename = ?", (policy, filename))
+        conn.commit()
+    finally:
+        conn.close()
+
+def rebuild_phr_index():
+    """
+    Upsert every stored PHR into the phr_meta index, in one scandir pass over cloud/meta and cloud/data.
+
+    Run at startup so files stored before the index existed (or changed while the
+    server was down) are listed. Metadata without a matching data file is left out
+    (it cannot be downloaded). Nothing is deleted here: another worker may be indexing
+    an upload while this scan runs, and rows whose files are gone are pruned by
+    list_indexed_phrs instead.
+    """
+    data_entries = {entry.name: entry for entry in scan_dir(CLOUD_DATA)}
+    rows = []
+    for meta_entry in scan_dir(CLOUD_META):
+        if not meta_entry.name.endswith(".json"):
+            continue
+        try:
+            meta = load_meta(meta_entry.path, meta_entry.stat())
+            meta.setdefault("file", f"{display_name(meta_entry.name)}.enc")
+            data_entry = data_entries.get(meta["file"])
+            if data_entry is None:
+                continue
+            rows.append(_index_row(meta, data_entry.stat()))
+        except (json.JSONDecodeError, IOError):
+            continue
+
+    conn = get_connection()
+    try:
+        conn.executemany(_INDEX_UPSERT, rows)
+        conn.commit()
+    finally:
+        conn.close()
+
+def list_indexed_phrs(owner=None):
+    """
+    List stored PHRs from the phr_meta index, oldest upload first.
+
+    Rows whose data or metadata file has disappeared outside upload/revoke (manual
+    cleanup, restores, other tools) are dropped from the index instead of listed.
+
+    Args:
+        owner: Only list this user's files (None for all files)
+
+    Returns:
+        List of dicts with file, owner, policy, key_blob, iv, size and mtime
+    """
+    query = "SELECT filename, owner, policy, key_blob, iv, size, mtime FROM phr_meta"
+    params = ()
+    if owner is not None:
+        query += " WHERE owner = ?"
+        params = (owner,)
+    query += " ORDER BY mtime"
+
+    conn = get_connection()
+    try:
+        rows = conn.execute(query, params).fetchall()
+
+        phrs = []
+        stale = []
+        for r in rows:
+            if not (CLOUD_DATA / r[0]).is_file() or not meta_path_for(r[0]).is_file():
+                stale.append((r[0],))
+                continue
+            phrs.append({
+                "file": r[0],
+                "owner": r[1],
+                "policy": r[2],
+                "key_blob": r[3],
+                "iv": r[4],
+                "size": r[5],
+                "mtime": r[6]
+            })
+
+        if stale:
+            conn.executemany("DELETE FROM phr_meta WHERE filename = ?", stale)
+            conn.commit()
+    finally:
+        conn.close()
+
+    return phrs
+
 def store_encrypted_phr(owner_id, file_storage, policy, key_blob, iv):
     """
     Store a PHR that was already encrypted by the client.
@@ -26,11 +254,8 @@ def store_encrypted_phr(owner_id, file_storage, policy, key_blob, iv):
         key_blob: Encrypted AES key (from client)
         iv: IV used for encryption (from client)
     """
-    if not os.path.exists(CLOUD_DATA):
-        os.makedirs(CLOUD_DATA)
-
-    if not os.path.exists(CLOUD_META):
-        os.makedirs(CLOUD_META)
+    CLOUD_DATA.mkdir(parents=True, exist_ok=True)
+    CLOUD_META.mkdir(parents=True, exist_ok=True)
         
     # Get original filename
     original_filename = file_storage.filename
@@ -42,8 +267,8 @@ def store_encrypted_phr(owner_id, file_storage, policy, key_blob, iv):
     else:
         enc_filename = original_filename
         
-    enc_path = os.path.join(CLOUD_DATA, enc_filename)
-    meta_path = os.path.join(CLOUD_META, f"{enc_filename.replace('.enc', '')}.json")
+    enc_path = CLOUD_DATA / enc_filename
+    meta_path = meta_path_for(enc_filename)
     # If filename was handled weirdly before (enc_file replace .enc .json), align with that.
     # Old logic: file.enc -> file.json
     
@@ -59,7 +284,7 @@ def store_encrypted_phr(owner_id, file_storage, policy, key_blob, iv):
         "mode": "client_side_encryption" 
     }
 
-    with open(meta_path, "w") as f:
-        json.dump(metadata, f, indent=2)
+    write_meta(meta_path, metadata)
+    index_phr(metadata, enc_path.stat())
 
     return enc_filename
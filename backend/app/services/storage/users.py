@@ -1,5 +1,7 @@
 import sqlite3
+import time
 import uuid
+from collections import OrderedDict
 from argon2 import PasswordHasher
 from argon2.exceptions import VerifyMismatchError
 from .db import get_connection, init_db
@@ -8,6 +10,41 @@ ph = PasswordHasher()
 
 ALLOWED_ROLES = {"patient", "doctor", "admin"}
 
+# Short-lived cache for the per-user lookups behind /api/session and policy checks.
+# Entries are dropped on attribute changes; anything else is at most USER_CACHE_TTL stale.
+# LRU-bounded to USER_CACHE_MAXSIZE entries; password hashes are never cached.
+USER_CACHE_TTL = 30
+USER_CACHE_MAXSIZE = 1024
+_user_cache = OrderedDict()
+
+def _cache_get(key):
+    hit = _user_cache.get(key)
+    if hit is None:
+        return None
+    if hit[0] <= time.monotonic():
+        _user_cache.pop(key, None)
+        return None
+    _user_cache.move_to_end(key)
+    return dict(hit[1])
+
+def _cache_put(key, value):
+    now = time.monotonic()
+    _user_cache[key] = (now + USER_CACHE_TTL, dict(value))
+    _user_cache.move_to_end(key)
+    # Expired entries go first, then least recently used ones until within bound
+    for stale in [k for k, (expires, _) in _user_cache.items() if expires <= now]:
+        del _user_cache[stale]
+    while len(_user_cache) > USER_CACHE_MAXSIZE:
+        _user_cache.popitem(last=False)
+
+def invalidate_user_cache(user_id=None):
+    """Drop cached lookups for one user, or for every user when user_id is None."""
+    if user_id is None:
+        _user_cache.clear()
+    else:
+        _user_cache.pop(("user", user_id), None)
+        _user_cache.pop(("attributes", user_id), None)
+
 def hash_password(password):
     return ph.hash(password)
 
@@ -42,6 +79,7 @@ def create_user(email, password, role, name=None, user_id=None):
         raise ValueError("Email already registered")
     
     conn.close()
+    invalidate_user_cache(user_id)
     return user_id
 
 def create_admin_user(email, password, name=None):
@@ -71,53 +109,58 @@ def get_user_by_email(email):
     return None
 
 def get_user_by_id(user_id):
+    cached = _cache_get(("user", user_id))
+    if cached is not None:
+        return cached
+
     conn = get_connection()
     cur = conn.cursor()
-    cur.execute("SELECT user_id, email, name, password_hash, role FROM users WHERE user_id = ?", (user_id,))
+    cur.execute("SELECT user_id, email, name, role FROM users WHERE user_id = ?", (user_id,))
     row = cur.fetchone()
     conn.close()
     
     if row:
-        return {
+        user = {
             "user_id": row[0],
             "email": row[1],
             "name": row[2],
-            "password_hash": row[3],
-            "role": row[4]
+            "role": row[3]
         }
+        _cache_put(("user", user_id), user)
+        return user
     return None
 
 def get_user_attributes(user_id):
+    cached = _cache_get(("attributes", user_id))
+    if cached is not None:
+        return cached
+
+    # Role and stored attributes in one query; no rows means the user does not exist
     conn = get_connection()
     cur = conn.cursor()
-    cur.execute("SELECT key, value FROM attributes WHERE user_id = ?", (user_id,))
+    cur.execute("""
+        SELECT u.role, a.key, a.value
+        FROM users u
+        LEFT JOIN attributes a ON a.user_id = u.user_id
+        WHERE u.user_id = ?
+    """, (user_id,))
     rows = cur.fetchall()
     conn.close()
-    
+
     attributes = {}
-    for key, value in rows:
-        attributes[key] = value
-    
-    # Auto-derive Role attribute from users table if needed, or rely on explicit attributes?
-    # User requested: "Optionally auto-assign Role:<role> attribute... but no others"
-    # To keep it robust, let's fetch role from users table and append it if missing?
-    # Or just return explicitly stored attributes.
-    # Plan said: "Optionally auto-assign Role:<role> attribute... but no others"
-    # Let's derive it to ensure CP-ABE policy works without manual admin step for basic role.
-    
-    user = get_user_by_id(user_id)
-    if user:
-        # Canonical role attribute. Capitalized to match CP-ABE convention in this system?
-        # System uses "Role:Doctor" etc.
-        role_attr = f"Role:{user['role'].capitalize()}"
-        attributes["Role"] = user["role"].capitalize() # Or however policy expects it.
-        # Actually traditionally attributes are a set of strings. 
-        # But this function returns a dict {key: value}.
-        # Existing encryption uses "Role:Doctor". 
-        # So key is "Role", value is "Doctor".
-        if "Role" not in attributes:
-            attributes["Role"] = user["role"].capitalize()
-            
+    if not rows:
+        return attributes
+
+    for _, key, value in rows:
+        if key is not None:
+            attributes[key] = value
+
+    # Derive the Role attribute (e.g. "Role:Doctor") from the account role so policies
+    # work without a manual admin step; it always reflects the users table
+    attributes["Role"] = rows[0][0].capitalize()
+
+    # Only cache attributes of known users so a later create_user isn't masked
+    _cache_put(("attributes", user_id), attributes)
     return attributes
 
 def add_attribute(user_id, key, value):
@@ -131,6 +174,7 @@ def add_attribute(user_id, key, value):
         conn.commit()
     finally:
         conn.close()
+        invalidate_user_cache(user_id)
 
 def remove_attribute(user_id, key):
     conn = get_connection()
@@ -143,34 +187,32 @@ def remove_attribute(user_id, key):
         conn.commit()
     finally:
         conn.close()
+        invalidate_user_cache(user_id)
 
 def get_all_users_with_attributes():
     conn = get_connection()
     cur = conn.cursor()
     
-    # Get all users
-    cur.execute("SELECT user_id, email, name, role FROM users")
-    users_rows = cur.fetchall()
+    # Users and their attributes in one pass; users without attributes come back once with NULLs
+    cur.execute("""
+        SELECT u.user_id, u.email, u.name, u.role, a.key, a.value
+        FROM users u
+        LEFT JOIN attributes a ON a.user_id = u.user_id
+    """)
+    rows = cur.fetchall()
+    conn.close()
     
     users = {}
-    for r in users_rows:
-        uid = r[0]
-        users[uid] = {
-            "user_id": uid,
-            "email": r[1],
-            "name": r[2],
-            "role": r[3],
-            "attributes": {}
-        }
-    
-    # Get all attributes
-    cur.execute("SELECT user_id, key, value FROM attributes")
-    attr_rows = cur.fetchall()
-    
-    for r in attr_rows:
-        uid, key, val = r[0], r[1], r[2]
-        if uid in users:
-            users[uid]["attributes"][key] = val
-            
-    conn.close()
+    for uid, email, name, role, key, value in rows:
+        user = users.get(uid)
+        if user is None:
+            user = users[uid] = {
+                "user_id": uid,
+                "email": email,
+                "name": name,
+                "role": role,
+                "attributes": {}
+            }
+        if key is not None:
+            user["attributes"][key] = value
     return users
@@ -1,4 +1,6 @@
-from flask import jsonify, make_response
+from functools import wraps
+from flask import jsonify, make_response, session
+from app.services.audit.logger import audit_deny
 
 
 def api_success(data=None):
@@ -37,3 +39,29 @@ def api_error(message, status_code=400):
     response.status_code = status_code
     return response
 
+
+def require_role(role):
+    """
+    Restrict a route to logged-in users holding the given role.
+
+    Denials are audited and answered with the standard error response:
+    401 when there is no session, 403 when the role does not match.
+
+    Args:
+        role: Required session role ("patient", "doctor" or "admin")
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            user_id = session.get("user_id")
+            if not user_id:
+                audit_deny("anonymous", None, "DENIED_AUTH")
+                return api_error("Unauthorized", 401)
+
+            if session.get("role") != role:
+                audit_deny(user_id, None, "DENIED_ROLE")
+                return api_error(f"Forbidden: {role} role required", 403)
+
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
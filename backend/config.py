@@ -23,6 +23,17 @@ class Config:
     SECRET_KEY = os.environ.get("SECRET_KEY", "sesphr-secret-key-prod")
     SESSION_COOKIE_SAMESITE = "Lax"
     SESSION_COOKIE_SECURE = False # Dev default
+    # Only re-sign and send the session cookie when the session changes (login/logout),
+    # not on every request that merely reads it
+    SESSION_REFRESH_EACH_REQUEST = False
+
+    # Hand file downloads to the front-end server (Apache mod_xsendfile / lighttpd) instead of
+    # streaming them through Python. Only enable when such a server sits in front of the app.
+    USE_X_SENDFILE = os.environ.get("USE_X_SENDFILE") == "1"
+    # nginx equivalent: an internal location aliased to cloud/data, e.g.
+    #   location /_protected/ { internal; alias /path/to/cloud/data/; }
+    # Set to that location ("/_protected/") to answer downloads with X-Accel-Redirect.
+    X_ACCEL_REDIRECT_PREFIX = os.environ.get("X_ACCEL_REDIRECT_PREFIX")
     
     @staticmethod
     def init_app(app):
@@ -1,8 +1,7 @@
 import shutil
-import os
 import sys
 from config import Config
-from app.services.storage.db import init_db
+from app.services.storage.db import init_db, remove_db_files
 
 def reset_system():
     print("⚠️  WARNING: This will WIPE ALL DATA (Files, Keys, Database, Logs).")
@@ -32,12 +31,10 @@ def reset_system():
         Config.CLOUD_KEYS_USERS.mkdir(parents=True, exist_ok=True)
 
     print("[4/5] Clearing Audit Logs...")
-    if Config.AUDIT_LOG_PATH.exists():
-        os.remove(Config.AUDIT_LOG_PATH)
+    Config.AUDIT_LOG_PATH.unlink(missing_ok=True)
 
     print("[5/5] Re-initializing Database...")
-    if Config.DB_PATH.exists():
-        os.remove(Config.DB_PATH)
+    remove_db_files()
     
     # Initialize fresh DB
     init_db()
@@ -0,0 +1,107 @@
+import unittest
+import sys
+import json
+import subprocess
+import tempfile
+import threading
+from pathlib import Path
+
+# Add project root to sys.path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.services.audit import logger
+
+class TestModule4(unittest.TestCase):
+    def setUp(self):
+        # Point the audit logger at a scratch file so the real log is untouched
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.original_log_file = logger.LOG_FILE
+        logger.LOG_FILE = Path(self.tmp_dir.name) / "audit.log"
+
+    def tearDown(self):
+        logger.LOG_FILE = self.original_log_file
+        self.tmp_dir.cleanup()
+
+    def test_01_read_events_newest_first(self):
+        """Verify read_events tails the log newest-first and honours limit/before"""
+        with open(logger.LOG_FILE, "w") as f:
+            for ts in range(1, 501):
+                f.write(json.dumps({"timestamp": ts, "status": "GRANTED"}) + "\n")
+            f.write("not json\n\n")
+
+        events = logger.read_events()
+        self.assertEqual(len(events), 500)
+        self.assertEqual([e["timestamp"] for e in events], list(range(500, 0, -1)))
+
+        events = logger.read_events(limit=3)
+        self.assertEqual([e["timestamp"] for e in events], [500, 499, 498])
+
+        events = logger.read_events(limit=2, before=100)
+        self.assertEqual([e["timestamp"] for e in events], [99, 98])
+        print("\n[Pass] Audit Log Tail Read Verified")
+
+    def test_02_hash_chain_links(self):
+        """Verify log_event chains each entry to the previous entry's hash"""
+        self.assertEqual(logger.read_events(), [])
+
+        logger.log_event("user_a", "file_a", "ACCESS", "GRANTED")
+        logger.audit_deny("user_b", None, "DENIED_POLICY")
+
+        newest, oldest = logger.read_events()
+        self.assertEqual(oldest["prev_hash"], "")
+        self.assertEqual(newest["prev_hash"], oldest["hash"])
+        self.assertEqual(newest["file"], "unknown")
+        print("[Pass] Audit Hash Chain Verified")
+
+    def test_03_concurrent_writes_keep_chain(self):
+        """Verify concurrent log_event calls never fork the hash chain"""
+        def worker(n):
+            for i in range(25):
+                logger.log_event(f"user_{n}", f"file_{i}", "ACCESS", "GRANTED")
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        with open(logger.LOG_FILE, "r") as f:
+            entries = [json.loads(line) for line in f]
+        self.assertEqual(len(entries), 200)
+        for prev, entry in zip(entries, entries[1:]):
+            self.assertEqual(entry["prev_hash"], prev["hash"])
+
+        # An append from outside this process is picked up instead of the memoized hash
+        with open(logger.LOG_FILE, "a") as f:
+            f.write(json.dumps({"timestamp": 0, "hash": "external"}) + "\n")
+        logger.log_event("user_x", "file_x", "ACCESS", "GRANTED")
+        self.assertEqual(logger.read_events(limit=1)[0]["prev_hash"], "external")
+        print("[Pass] Concurrent Audit Writes Verified")
+
+    def test_04_multi_process_writes_keep_chain(self):
+        """Verify log_event calls from separate worker processes never fork the hash chain"""
+        script = (
+            "import sys; sys.path.insert(0, sys.argv[1]);"
+            "from pathlib import Path;"
+            "from app.services.audit import logger;"
+            "logger.LOG_FILE = Path(sys.argv[2]);"
+            "[logger.log_event('worker', 'file_%d' % i, 'ACCESS', 'GRANTED') for i in range(50)]"
+        )
+        procs = [
+            subprocess.Popen([sys.executable, "-c", script, str(project_root), str(logger.LOG_FILE)])
+            for _ in range(4)
+        ]
+        for proc in procs:
+            self.assertEqual(proc.wait(), 0)
+
+        with open(logger.LOG_FILE, "r") as f:
+            entries = [json.loads(line) for line in f]
+        self.assertEqual(len(entries), 200)
+        self.assertEqual(entries[0]["prev_hash"], "")
+        for prev, entry in zip(entries, entries[1:]):
+            self.assertEqual(entry["prev_hash"], prev["hash"])
+        print("[Pass] Multi-Process Audit Writes Verified")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,185 @@
+import unittest
+import io
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add project root to sys.path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app import create_app
+from app.services.audit import logger
+from app.services.storage import db, phr
+from config import Config
+
+class TestModule6(unittest.TestCase):
+    # Every role-gated route and the role it requires
+    PROTECTED_ROUTES = [
+        ("GET", "/api/patient/files", "patient"),
+        ("POST", "/api/patient/upload", "patient"),
+        ("POST", "/api/patient/revoke", "patient"),
+        ("GET", "/api/doctor/files", "doctor"),
+        ("POST", "/api/doctor/access", "doctor"),
+        ("GET", "/api/doctor/download/none.enc", "doctor"),
+        ("GET", "/api/admin/users", "admin"),
+        ("POST", "/api/admin/attributes", "admin"),
+        ("GET", "/api/admin/audit", "admin"),
+    ]
+
+    def setUp(self):
+        # Run against scratch storage so the real cloud/ tree, database and audit log are untouched
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        scratch = Path(tmp_dir.name)
+
+        self._redirect(Config, "CLOUD_DATA", scratch / "cloud" / "data")
+        self._redirect(Config, "CLOUD_META", scratch / "cloud" / "meta")
+        self._redirect(phr, "CLOUD_DATA", Config.CLOUD_DATA)
+        self._redirect(phr, "CLOUD_META", Config.CLOUD_META)
+        self._redirect(db, "DB_PATH", scratch / "sesphr.db")
+        self._redirect(logger, "LOG_FILE", scratch / "audit.log")
+        # Registered last so it runs first: close pooled handles on the scratch database
+        self.addCleanup(db.close_all_connections)
+
+        os.environ["FLASK_ENV"] = "development"
+        self.flask_app = create_app('default')
+        self.app = self.flask_app.test_client()
+        self.flask_app.testing = True
+
+    def _redirect(self, owner, name, value):
+        self.addCleanup(setattr, owner, name, getattr(owner, name))
+        setattr(owner, name, value)
+
+    def test_01_signup_rejects_non_string_fields(self):
+        """Verify signup answers 400 (not 500) when role or email is not a string"""
+        bad_payloads = [
+            ({"email": "mod6@test.com", "password": "pass", "role": ["doctor"]}, "Invalid role. Must be patient or doctor"),
+            ({"email": "mod6@test.com", "password": "pass", "role": {"doctor": 1}}, "Invalid role. Must be patient or doctor"),
+            ({"email": ["mod6@test.com"], "password": "pass", "role": "doctor"}, "Invalid email format"),
+            ({"email": {"a": "b"}, "password": "pass", "role": "patient"}, "Invalid email format"),
+        ]
+        for payload, error in bad_payloads:
+            resp = self.app.post("/api/signup", json=payload)
+            self.assertEqual(resp.status_code, 400, payload)
+            self.assertEqual(resp.get_json()["error"], error)
+        print("\n[Pass] Signup Type Validation Verified")
+
+    def _upload_as(self, patient_id, filename):
+        with self.app.session_transaction() as sess:
+            sess["user_id"] = patient_id
+            sess["role"] = "patient"
+        data = {
+            "file": (io.BytesIO(os.urandom(64)), filename),
+            "policy": "Role:Doctor",
+            "key_blob": os.urandom(32).hex(),
+            "iv": os.urandom(12).hex()
+        }
+        resp = self.app.post("/api/patient/upload", data=data, content_type="multipart/form-data")
+        self.assertEqual(resp.status_code, 200)
+
+    def _list_as(self, patient_id):
+        with self.app.session_transaction() as sess:
+            sess["user_id"] = patient_id
+            sess["role"] = "patient"
+        resp = self.app.get("/api/patient/files")
+        self.assertEqual(resp.status_code, 200)
+        return resp.get_json()["data"]["files"]
+
+    def test_02_patient_lists_only_own_files(self):
+        """Verify each patient's file listing holds only their own records"""
+        self._upload_as("test_patient_mod6_a", "mod6_a_record.txt")
+        self._upload_as("test_patient_mod6_b", "mod6_b_record.txt")
+
+        for patient_id, own, other in [
+            ("test_patient_mod6_a", "mod6_a_record.txt", "mod6_b_record.txt"),
+            ("test_patient_mod6_b", "mod6_b_record.txt", "mod6_a_record.txt"),
+        ]:
+            files = self._list_as(patient_id)
+            names = [f["filename"] for f in files]
+            self.assertIn(own, names)
+            self.assertNotIn(other, names)
+            self.assertTrue(all(f["owner"] == patient_id for f in files), files)
+        print("[Pass] Patient Listing Isolation Verified")
+
+    def test_02b_listing_prunes_files_removed_outside_the_api(self):
+        """Verify files deleted from cloud/ behind the app's back drop out of the listing and index"""
+        self._upload_as("test_patient_mod6_a", "mod6_kept.txt")
+        self._upload_as("test_patient_mod6_a", "mod6_gone_data.txt")
+        self._upload_as("test_patient_mod6_a", "mod6_gone_meta.txt")
+        (Config.CLOUD_DATA / "mod6_gone_data.txt.enc").unlink()
+        (Config.CLOUD_META / "mod6_gone_meta.txt.json").unlink()
+
+        names = [f["filename"] for f in self._list_as("test_patient_mod6_a")]
+        self.assertEqual(names, ["mod6_kept.txt"])
+
+        conn = db.get_connection()
+        try:
+            indexed = [r[0] for r in conn.execute("SELECT filename FROM phr_meta")]
+        finally:
+            conn.close()
+        self.assertEqual(indexed, ["mod6_kept.txt.enc"])
+
+        # A startup re-sync adds files back from disk but never deletes existing rows
+        phr.rebuild_phr_index()
+        self.assertEqual([f["file"] for f in phr.list_indexed_phrs()], ["mod6_kept.txt.enc"])
+        print("[Pass] Stale Index Pruning Verified")
+
+    def test_03_anonymous_requests_denied(self):
+        """Verify role-gated routes answer 401 and audit DENIED_AUTH without a session"""
+        for method, path, _ in self.PROTECTED_ROUTES:
+            resp = self.app.open(path, method=method, json={})
+            self.assertEqual(resp.status_code, 401, path)
+            self.assertEqual(resp.get_json()["error"], "Unauthorized")
+
+            entry = logger.read_events(limit=1)[0]
+            self.assertEqual(entry["user"], "anonymous")
+            self.assertEqual(entry["status"], "DENIED_AUTH")
+
+        self.assertEqual(len(logger.read_events()), len(self.PROTECTED_ROUTES))
+        print("[Pass] Anonymous Access Denial Verified")
+
+    def test_04_wrong_role_denied(self):
+        """Verify role-gated routes answer 403 and audit DENIED_ROLE for other roles"""
+        for method, path, role in self.PROTECTED_ROUTES:
+            wrong_role = "doctor" if role == "patient" else "patient"
+            with self.app.session_transaction() as sess:
+                sess["user_id"] = "test_mod6_wrong_role"
+                sess["role"] = wrong_role
+
+            resp = self.app.open(path, method=method, json={})
+            self.assertEqual(resp.status_code, 403, path)
+            self.assertEqual(resp.get_json()["error"], f"Forbidden: {role} role required")
+
+            entry = logger.read_events(limit=1)[0]
+            self.assertEqual(entry["user"], "test_mod6_wrong_role")
+            self.assertEqual(entry["status"], "DENIED_ROLE")
+
+        self.assertEqual(len(logger.read_events()), len(self.PROTECTED_ROUTES))
+        print("[Pass] Wrong Role Denial Verified")
+
+    def test_05_download_headers_match_with_x_accel(self):
+        """Verify the X-Accel-Redirect download sends the same Content-Disposition as the direct one"""
+        with self.app.session_transaction() as sess:
+            sess["user_id"] = "test_doctor_mod6"
+            sess["role"] = "doctor"
+
+        for filename in ["rec.txt.enc", "r\u00e9sum\u00e9 record.enc"]:
+            (Config.CLOUD_DATA / filename).write_bytes(os.urandom(32))
+
+            self.flask_app.config["X_ACCEL_REDIRECT_PREFIX"] = None
+            direct = self.app.get(f"/api/doctor/download/{filename}")
+            self.flask_app.config["X_ACCEL_REDIRECT_PREFIX"] = "/_protected/"
+            accel = self.app.get(f"/api/doctor/download/{filename}")
+
+            self.assertEqual(direct.status_code, 200)
+            self.assertEqual(accel.status_code, 200)
+            self.assertIn("X-Accel-Redirect", accel.headers)
+            self.assertEqual(accel.headers["Content-Disposition"], direct.headers["Content-Disposition"])
+
+        self.assertEqual(direct.headers["Content-Disposition"].count("filename*="), 1)
+        print("[Pass] Download Content-Disposition Parity Verified")
+
+if __name__ == "__main__":
+    unittest.main()